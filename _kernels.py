@@ -0,0 +1,70 @@
+"""Numeric kernels for the inventory analysis hot paths.
+
+Compiled with Numba when it is available; extractData falls back to plain
+NumPy expressions otherwise, so Numba stays an optional dependency.
+
+fastmath is deliberately not enabled: both kernels rely on NaN as the
+missing-value sentinel and fastmath licenses the compiler to assume NaN
+never occurs.
+"""
+import numpy as np
+
+try:
+    from numba import njit
+    HAS_NUMBA = True
+except ImportError:
+    HAS_NUMBA = False
+
+    def njit(*args, **kwargs):
+        """Stand-in decorator so the kernels stay importable without Numba."""
+        if args and callable(args[0]):
+            return args[0]
+
+        def wrap(func):
+            return func
+        return wrap
+
+
+@njit(cache=True)
+def compute_diffs(data):
+    """Subtract each history column from the one before it.
+
+    Args:
+        data: 2-D float64 array of shape (labels, columns), NaN = missing
+
+    Returns:
+        2-D float64 array of shape (labels, columns - 1); entries are NaN
+        wherever either input value was NaN
+    """
+    n, m = data.shape
+    out = np.empty((n, m - 1))
+    for j in range(m - 1):
+        for i in range(n):
+            out[i, j] = data[i, j] - data[i, j + 1]
+    return out
+
+
+@njit(cache=True)
+def masked_mean_nonneg(diffs):
+    """Mean of the non-negative entries per row.
+
+    Args:
+        diffs: 2-D float64 array of differences, NaN = missing
+
+    Returns:
+        1-D float64 array with one mean per row; NaN for rows without any
+        usable (non-NaN, non-negative) entries
+    """
+    n, m = diffs.shape
+    out = np.full(n, np.nan)
+    for i in range(n):
+        total = 0.0
+        count = 0
+        for j in range(m):
+            value = diffs[i, j]
+            if not np.isnan(value) and value >= 0.0:
+                total += value
+                count += 1
+        if count:
+            out[i] = total / count
+    return out
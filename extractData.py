@@ -1,10 +1,18 @@
+import hashlib
+import re
 import pandas as pd
 from pathlib import Path
-from openpyxl import load_workbook, Workbook
-from openpyxl.styles import PatternFill, Font, Alignment
-from openpyxl.utils import get_column_letter
+from openpyxl import load_workbook
 import numpy as np
-from datetime import datetime
+from _kernels import HAS_NUMBA, compute_diffs, masked_mean_nonneg
+
+_SALE_HEADER_RE = re.compile(r'^Sale (\d+)$')
+
+# Endpoints of the shortage gradient shown in the Status column; the midpoint
+# matches the old per-cell interpolation at shortage 7.5
+SHORTAGE_MIN_COLOR = '#C6EFCE'
+SHORTAGE_MID_COLOR = '#E2DBCE'
+SHORTAGE_MAX_COLOR = '#FFC7CE'
 
 
 class InventoryManager:
@@ -23,6 +31,20 @@ class InventoryManager:
             'average': 'Average Use',
             'predictions': 'Current Inventory & Predictions'
         }
+        # In-memory workbook state, loaded lazily and kept across GUI actions;
+        # the xlsx is only read once per session and only written by save().
+        # History is stored column-oriented: an ordered label list with a
+        # label -> row index, the column headers, and a labels x columns
+        # float64 matrix where NaN marks missing values.
+        self._labels = None
+        self._label_index = None
+        self._headers = None
+        self._column_types = None  # parsed ('sale', n) / ('restock', None) per header
+        self._matrix = None
+        self._diffs = None        # (diff_headers, diff_matrix) or None when stale
+        self._averages = None     # float64 array aligned with _labels, NaN = no data
+        self._predictions = None  # list of prediction row tuples
+        self._history_digest_cached = None  # digest the caches were computed from
     
     def extract_columns(self, file_path: str, column_headers: list) -> dict:
         """Extract specific columns from an Excel file based on header titles.
@@ -37,470 +59,444 @@ class InventoryManager:
         Raises:
             ValueError: If any column header is not found in the Excel file
         """
-        df = pd.read_excel(file_path)
-        
-        # Verify all requested columns exist
-        missing_columns = [col for col in column_headers if col not in df.columns]
-        if missing_columns:
-            raise ValueError(f"Columns not found in Excel file: {missing_columns}")
-        
-        # Extract requested columns
-        extracted_data = {col: df[col].tolist() for col in column_headers}
-        return extracted_data
+        if Path(file_path).suffix.lower() == '.xls':
+            # openpyxl only reads xlsx; let pandas handle the legacy format
+            df = pd.read_excel(file_path)
+            missing_columns = [col for col in column_headers if col not in df.columns]
+            if missing_columns:
+                raise ValueError(f"Columns not found in Excel file: {missing_columns}")
+            return {col: df[col].tolist() for col in column_headers}
+
+        # Stream the sheet instead of materializing it as a DataFrame; only
+        # the requested columns are kept
+        wb = load_workbook(file_path, read_only=True, data_only=True)
+        try:
+            ws = wb.active
+            rows = ws.iter_rows(values_only=True)
+            header_row = next(rows, None)
+            headers = list(header_row) if header_row is not None else []
+
+            # Verify all requested columns exist
+            missing_columns = [col for col in column_headers if col not in headers]
+            if missing_columns:
+                raise ValueError(f"Columns not found in Excel file: {missing_columns}")
+
+            indices = [headers.index(col) for col in column_headers]
+            extracted_data = {col: [] for col in column_headers}
+            for row in rows:
+                # Read-only sheets can yield trailing all-empty rows that a
+                # DataFrame would have dropped
+                if all(value is None for value in row):
+                    continue
+                for col, idx in zip(column_headers, indices):
+                    extracted_data[col].append(row[idx] if idx < len(row) else None)
+            return extracted_data
+        finally:
+            wb.close()
     
-    def _get_or_create_sheet(self, wb, sheet_name: str):
-        """Get an existing sheet or create a new one.
-        
+    def update_inventory_history(self, labels: list, stock_values: list, sale_number: str):
+        """Add new sale data to the cached inventory history.
+
+        Maintains alignment of box labels and backfills missing data for new
+        boxes. Call save() to write the result to disk.
+
         Args:
-            wb: Workbook object
-            sheet_name: Name of the sheet
-            
-        Returns:
-            Worksheet object
-        """
-        if sheet_name in wb.sheetnames:
-            return wb[sheet_name]
-        else:
-            return wb.create_sheet(sheet_name)
-    
-    def _load_or_create_workbook(self):
-        """Load existing workbook or create a new one.
-        
-        Returns:
-            Workbook object
+            labels: List of box labels from the input file
+            stock_values: List of corresponding stock values
+            sale_number: Sale number to use as column header
         """
-        output_path = Path(self.output_file)
-        if output_path.exists():
-            return load_workbook(output_path)
-        else:
-            wb = Workbook()
-            # Remove the default sheet if it exists
-            if 'Sheet' in wb.sheetnames:
-                wb.remove(wb['Sheet'])
-            return wb
-    
-    def _organize_sheets(self, wb):
-        """Organize sheets in the desired order and remove any default sheets.
-        
-        Order: Current Inventory & Predictions, Inventory History, Sales Differences, Average Use
-        
-        Args:
-            wb: Workbook object
+        self._append_history_column(labels, stock_values, f'Sale {sale_number}')
+
+    def _require_state(self):
+        """Load the cached state, failing if no data exists yet.
+
+        Raises:
+            FileNotFoundError: If no state is cached and the output file
+                does not exist
         """
-        # Define desired sheet order
-        desired_order = [
-            self.sheet_names['predictions'],
-            self.sheet_names['history'],
-            self.sheet_names['differences'],
-            self.sheet_names['average']
-        ]
-        
-        # Remove any default or unwanted sheets
-        for sheet_name in wb.sheetnames[:]:
-            if sheet_name not in desired_order:
-                wb.remove(wb[sheet_name])
-        
-        # Reorder sheets according to desired order
-        for idx, sheet_name in enumerate(desired_order):
-            if sheet_name in wb.sheetnames:
-                sheet = wb[sheet_name]
-                wb.move_sheet(sheet, offset=idx - wb.index(sheet))
-    
-    def _get_existing_labels(self, ws):
-        """Extract existing labels from column A of a worksheet.
-        
-        Args:
-            ws: Worksheet object
-            
-        Returns:
-            List of label values (excluding 'Label' header)
+        if self._labels is None and not Path(self.output_file).exists():
+            raise FileNotFoundError(f"Output file {self.output_file} does not exist")
+        self._ensure_state_loaded()
+
+    def _history_digest(self) -> bytes:
+        """Hash the cached history state.
+
+        Lets the recompute passes detect that their inputs are unchanged and
+        skip the work entirely. blake2b over the packed matrix bytes is cheap
+        relative to recomputing any of the passes.
         """
-        return [cell.value for cell in ws['A'][1:] if cell.value and cell.value != 'Label']
-    
-    def _merge_labels(self, existing_labels: list, new_labels: list) -> list:
-        """Merge existing and new labels while maintaining order and removing duplicates.
-        
-        Args:
-            existing_labels: List of existing labels
-            new_labels: List of new labels to add
-            
-        Returns:
-            Merged list without duplicates
+        digest = hashlib.blake2b(digest_size=16)
+        digest.update('\x1f'.join(map(str, self._labels)).encode())
+        digest.update('\x1f'.join(map(str, self._headers)).encode())
+        digest.update(np.ascontiguousarray(self._matrix).tobytes())
+        return digest.digest()
+
+    def _analysis_is_current(self, cache) -> bool:
+        """Check whether a cached result is still valid for the current history."""
+        return cache is not None and self._history_digest_cached == self._history_digest()
+
+    def update_sales_differences(self):
+        """Recalculate the cached sales differences.
+
+        Computes differences between consecutive sales (or restock to sale if consecutive).
+        Skips differences if sales are not consecutive. A no-op when the
+        history is unchanged since the last computation. Call save() to write
+        the result to disk.
         """
-        return list(dict.fromkeys(existing_labels + new_labels))
-    
-    def _write_labels_to_column(self, ws, labels: list, column: str = 'A'):
-        """Write labels to a column in the worksheet with 'Label' header.
-        
-        Args:
-            ws: Worksheet object
-            labels: List of labels to write
-            column: Column letter (default 'A')
+        self._require_state()
+        if self._analysis_is_current(self._diffs):
+            return
+        self._diffs = self._compute_differences()
+        self._history_digest_cached = self._history_digest()
+        self._averages = None
+        self._predictions = None
+
+    def update_average_use(self):
+        """Recalculate the cached average use per label.
+
+        Averages all non-negative sales differences. A no-op when the history
+        is unchanged since the last computation. Call save() to write the
+        result to disk.
         """
-        ws[f'{column}1'] = 'Label'
-        for idx, label in enumerate(labels, start=2):
-            ws[f'{column}{idx}'] = label
-    
-    def _add_inventory_column(self, ws, all_labels: list, label_to_stock: dict, column_header: str):
-        """Add a new inventory column to the worksheet.
-        
+        self._require_state()
+        if self._analysis_is_current(self._averages):
+            return
+        if self._diffs is None:
+            self._diffs = self._compute_differences()
+        self._averages = self._compute_average_use(self._diffs)
+        self._history_digest_cached = self._history_digest()
+        self._predictions = None
+
+    def update_predictions(self, current_stock_file: str = None, current_stock_columns: tuple = ('Label', 'Stock')):
+        """Recalculate the cached Current Inventory & Predictions rows.
+
+        Creates predictions based on average use and compares with current
+        stock. Call save() to write the result to disk.
+
         Args:
-            ws: Worksheet object
-            all_labels: Complete merged list of all box labels in correct order
-            label_to_stock: Dictionary mapping labels to their stock values
-            column_header: Header for the new column (e.g., 'Sale 155' or 'Restock')
+            current_stock_file: Path to file containing current stock data (if different from history)
+            current_stock_columns: Tuple of (label_column, stock_column) header names
         """
-        # Find the next available column
-        next_col = ws.max_column + 1 if ws.max_column > 0 else 2
-        col_letter = get_column_letter(next_col)
-        
-        # Write the column header
-        ws[f'{col_letter}1'] = column_header
-        
-        # Write stock values, leaving blanks for new boxes
-        for idx, label in enumerate(all_labels, start=2):
-            if label in label_to_stock:
-                ws[f'{col_letter}{idx}'] = label_to_stock[label]
-    
-    def _realign_existing_columns(self, ws, existing_labels: list, all_labels: list):
-        """Realign all existing inventory columns when new labels are added.
-        
-        This ensures that stock values in previous columns stay aligned with their correct labels
-        after new labels are inserted into the merged list.
-        
-        Args:
-            ws: Worksheet object
-            existing_labels: Original list of labels before merge
-            all_labels: Merged list of labels after adding new ones
+        self._require_state()
+        if self._analysis_is_current(self._predictions):
+            return
+        if self._diffs is None:
+            self._diffs = self._compute_differences()
+        if self._averages is None:
+            self._averages = self._compute_average_use(self._diffs)
+        self._predictions = self._compute_predictions(self._averages)
+        self._history_digest_cached = self._history_digest()
+
+    def _load_history_state(self):
+        """Read the Inventory History sheet into the cached columnar state.
+
+        Populates the ordered label list, the label -> row index, the column
+        headers, and the labels x columns float64 value matrix. Missing or
+        non-numeric cells become NaN.
         """
-        # Create a mapping of old positions to new positions
-        label_to_new_row = {label: idx + 2 for idx, label in enumerate(all_labels)}
-        
-        # Get all inventory columns (columns B onwards)
-        for col in range(2, ws.max_column + 1):
-            col_letter = get_column_letter(col)
-            
-            # Store all values first to avoid overwriting
-            values_to_move = {}
-            for idx, label in enumerate(existing_labels, start=2):
-                cell_value = ws[f'{col_letter}{idx}'].value
-                if cell_value is not None:
-                    values_to_move[label] = cell_value
-            
-            # Clear the entire column except header
-            for row in range(2, ws.max_row + 1):
-                ws[f'{col_letter}{row}'].value = None
-            
-            # Write values back to new positions
-            for label, value in values_to_move.items():
-                new_row = label_to_new_row[label]
-                ws[f'{col_letter}{new_row}'] = value
-    
-    def _update_inventory_history_internal(self, labels: list, stock_values: list, column_header: str):
-        """Internal method to update inventory history with a new column.
-        
+        self._labels = []
+        self._label_index = {}
+        self._headers = []
+        self._column_types = []
+        self._matrix = np.empty((0, 0))
+
+        output_path = Path(self.output_file)
+        if not output_path.exists():
+            return
+
+        wb = load_workbook(output_path, read_only=True)
+        try:
+            if self.sheet_names['history'] not in wb.sheetnames:
+                return
+
+            ws = wb[self.sheet_names['history']]
+            rows = ws.iter_rows(values_only=True)
+            header_row = next(rows, None)
+            if header_row is None:
+                return
+
+            kept = [i for i, header in enumerate(header_row[1:], start=1) if header is not None]
+            self._headers = [header_row[i] for i in kept]
+            self._column_types = [self._parse_header(header) for header in self._headers]
+
+            value_rows = []
+            for row in rows:
+                label = row[0] if row else None
+                # The label column is written contiguously, so the first empty
+                # label marks the end of the data; stopping here avoids walking
+                # trailing rows that only exist as sheet padding
+                if not label or label == 'Label':
+                    break
+                self._label_index[label] = len(self._labels)
+                self._labels.append(label)
+                value_rows.append([row[i] if i < len(row) else None for i in kept])
+
+            if value_rows and kept:
+                # Coerce the whole block at once; blanks and non-numeric
+                # values become NaN without a per-cell try/except
+                raw = np.array(value_rows, dtype=object)
+                self._matrix = (pd.to_numeric(raw.ravel(), errors='coerce')
+                                .reshape(raw.shape)
+                                .astype(np.float64))
+            else:
+                self._matrix = np.full((len(self._labels), len(self._headers)), np.nan)
+        finally:
+            wb.close()
+
+    def _ensure_state_loaded(self):
+        """Load the history state from disk if it is not cached yet."""
+        if self._labels is None:
+            self._load_history_state()
+
+    def _invalidate_analysis(self):
+        """Discard cached analysis results after the history state changes."""
+        self._diffs = None
+        self._averages = None
+        self._predictions = None
+        self._history_digest_cached = None
+
+    def _append_history_column(self, labels: list, stock_values: list, column_header: str):
+        """Add a new inventory column to the cached history state.
+
+        New labels extend the matrix with NaN rows; the new column is then
+        filled by direct row-index assignment.
+
         Args:
             labels: List of box labels from the input file
             stock_values: List of corresponding stock values
             column_header: Column header (e.g., 'Sale 155' or 'Restock')
         """
-        output_path = Path(self.output_file)
-        
-        # Load or create the workbook
-        wb = self._load_or_create_workbook()
-        ws = self._get_or_create_sheet(wb, self.sheet_names['history'])
-        
-        # Get existing labels and merge with new ones
-        existing_labels = self._get_existing_labels(ws) if ws.max_row > 0 else []
-        all_labels = self._merge_labels(existing_labels, labels)
-        
-        # Realign existing columns if new labels were added
-        if len(all_labels) > len(existing_labels):
-            self._realign_existing_columns(ws, existing_labels, all_labels)
-        
-        # Write labels to column A
-        self._write_labels_to_column(ws, all_labels)
-        
-        # Create a mapping of labels to stock values
-        label_to_stock = dict(zip(labels, stock_values))
-        
-        # Add the new inventory column
-        self._add_inventory_column(ws, all_labels, label_to_stock, column_header)
-        
-        # Organize sheets and remove defaults
-        self._organize_sheets(wb)
-        wb.save(output_path)
-    
-    def update_inventory_history(self, labels: list, stock_values: list, sale_number: str):
-        """Update the Inventory History sheet with new sale data.
-        
-        Maintains alignment of box labels and backfills missing data for new boxes.
-        
+        self._ensure_state_loaded()
+
+        # The label index doubles as the membership set, so the common
+        # no-new-labels case costs one lookup per input label and no
+        # reallocation of the merged list
+        grown = 0
+        for label in labels:
+            if label not in self._label_index:
+                self._label_index[label] = len(self._labels)
+                self._labels.append(label)
+                grown += 1
+        if grown:
+            self._matrix = np.vstack((
+                self._matrix,
+                np.full((grown, self._matrix.shape[1]), np.nan),
+            ))
+
+        column = np.full((len(self._labels), 1), np.nan)
+        for label, value in zip(labels, stock_values):
+            if value is None:
+                continue
+            try:
+                column[self._label_index[label], 0] = float(value)
+            except (ValueError, TypeError):
+                pass
+
+        self._matrix = np.hstack((self._matrix, column))
+        self._headers.append(column_header)
+        self._column_types.append(self._parse_header(column_header))
+        self._invalidate_analysis()
+
+    @staticmethod
+    def _parse_header(header):
+        """Classify a history column header, once, at insertion or load time.
+
         Args:
-            labels: List of box labels from the input file
-            stock_values: List of corresponding stock values
-            sale_number: Sale number to use as column header
+            header: Column header value from the history sheet
+
+        Returns:
+            ('sale', number) or ('restock', None) tuple, or None for headers
+            that take no part in the difference analysis
         """
-        self._update_inventory_history_internal(labels, stock_values, f'Sale {sale_number}')
-    
-    def _update_inventory_history_restock(self, labels: list, stock_values: list):
-        """Update the Inventory History sheet with a restock entry.
-        
-        Args:
-            labels: List of box labels from the input file
-            stock_values: List of corresponding stock values
+        if isinstance(header, str):
+            match = _SALE_HEADER_RE.match(header)
+            if match:
+                return ('sale', int(match.group(1)))
+            if header.startswith('Restock'):
+                return ('restock', None)
+        return None
+
+    def _parse_history_columns(self) -> list:
+        """List the sale/restock columns with their matrix indices.
+
+        Header strings were already classified when the columns entered the
+        state, so recomputes do no string parsing at all.
+
+        Returns:
+            List of (type, sale_number, column_index) tuples where type is
+            'sale' or 'restock' and sale_number is None for restocks
         """
-        self._update_inventory_history_internal(labels, stock_values, 'Restock')
-    
-    def update_sales_differences(self):
-        """Calculate and update the Sales Differences sheet.
-        
-        Computes differences between consecutive sales (or restock to sale if consecutive).
-        Skips differences if sales are not consecutive.
+        return [
+            (column_type[0], column_type[1], idx)
+            for idx, column_type in enumerate(self._column_types)
+            if column_type is not None
+        ]
+
+    def _compute_differences(self) -> tuple:
+        """Compute sales-difference columns from the cached history matrix.
+
+        Differences are taken between consecutive sales (or restock to sale);
+        non-consecutive sale pairs are skipped. All column pairs are subtracted
+        in a single vectorized operation, with NaN marking entries where either
+        value is missing.
+
+        Returns:
+            (diff_headers, diff_matrix) tuple where diff_matrix has one column
+            per header, aligned with the cached label order
         """
-        output_path = Path(self.output_file)
-        if not output_path.exists():
-            raise FileNotFoundError(f"Output file {self.output_file} does not exist")
-        
-        wb = load_workbook(output_path)
-        history_ws = wb[self.sheet_names['history']]
-        
-        # Get labels and sales data from history sheet (skip header row)
-        labels = [cell.value for cell in history_ws['A'][1:] if cell.value and cell.value != 'Label']
-        
-        # Get all inventory columns (columns B onwards) with their metadata
-        inventory_columns = []
-        for col in range(2, history_ws.max_column + 1):
-            col_letter = get_column_letter(col)
-            header = history_ws[f'{col_letter}1'].value
-            
-            # Parse header to determine if it's a Sale or Restock
-            if header.startswith('Sale '):
-                sale_num = int(header.replace('Sale ', ''))
-                inventory_columns.append((col, col_letter, header, 'sale', sale_num))
-            elif header.startswith('Restock'):
-                inventory_columns.append((col, col_letter, header, 'restock', None))
-        
-        # Create or update the differences sheet
-        if self.sheet_names['differences'] in wb.sheetnames:
-            diff_ws = wb[self.sheet_names['differences']]
-            diff_ws.delete_rows(1, diff_ws.max_row)
+        columns = self._parse_history_columns()
+        if not self._labels or len(columns) < 2:
+            return ([], np.empty((len(self._labels or []), 0)))
+
+        data = self._matrix[:, [idx for _, _, idx in columns]]
+        if HAS_NUMBA:
+            all_diffs = compute_diffs(np.ascontiguousarray(data))
         else:
-            diff_ws = wb.create_sheet(self.sheet_names['differences'])
-        
-        # Write header and labels
-        diff_ws['A1'] = 'Label'
-        for idx, label in enumerate(labels, start=2):
-            diff_ws[f'A{idx}'] = label
-        
-        # Calculate differences between consecutive entries
-        diff_col_counter = 2  # Start from column B
-        for i in range(len(inventory_columns) - 1):
-            col1, col1_letter, header1, type1, sale_num1 = inventory_columns[i]
-            col2, col2_letter, header2, type2, sale_num2 = inventory_columns[i + 1]
-            
-            # Determine if we should calculate difference
-            should_calc_diff = False
-            diff_header = None
-            
-            # If both are sales and consecutive, calculate difference
-            if type1 == 'sale' and type2 == 'sale' and sale_num2 - sale_num1 == 1:
-                should_calc_diff = True
-                diff_header = f'Difference Sale {sale_num1} - Sale {sale_num2}'
-            # If first is restock and second is sale, calculate difference
+            all_diffs = data[:, :-1] - data[:, 1:]
+
+        diff_headers = []
+        keep = []
+        for j, ((type1, num1, _), (type2, num2, _)) in enumerate(zip(columns, columns[1:])):
+            if type1 == 'sale' and type2 == 'sale' and num2 - num1 == 1:
+                diff_headers.append(f'Difference Sale {num1} - Sale {num2}')
             elif type1 == 'restock' and type2 == 'sale':
-                should_calc_diff = True
-                diff_header = f'Difference Restock - Sale {sale_num2}'
-            
-            if not should_calc_diff:
+                diff_headers.append(f'Difference Restock - Sale {num2}')
+            else:
                 continue
-            
-            diff_col_letter = get_column_letter(diff_col_counter)
-            diff_ws[f'{diff_col_letter}1'] = diff_header
-            
-            # Calculate differences
-            for idx, label in enumerate(labels, start=2):
-                val1 = history_ws[f'{col1_letter}{idx}'].value
-                val2 = history_ws[f'{col2_letter}{idx}'].value
-                
-                # Only calculate if both values exist
-                if val1 is not None and val2 is not None:
-                    try:
-                        diff = float(val1) - float(val2)
-                        diff_ws[f'{diff_col_letter}{idx}'] = diff
-                    except (ValueError, TypeError):
-                        pass
-            
-            diff_col_counter += 1
-        
-        # Organize sheets and remove defaults
-        self._organize_sheets(wb)
-        wb.save(output_path)
-    
-    def update_average_use(self):
-        """Calculate and update the Average Use sheet.
-        
-        Averages all difference columns from the Sales Differences sheet.
-        """
-        output_path = Path(self.output_file)
-        if not output_path.exists():
-            raise FileNotFoundError(f"Output file {self.output_file} does not exist")
-        
-        wb = load_workbook(output_path)
-        diff_ws = wb[self.sheet_names['differences']]
-        
-        # Get labels (skip header row)
-        labels = [cell.value for cell in diff_ws['A'][1:] if cell.value and cell.value != 'Label']
-        
-        # Create or update the average use sheet
-        if self.sheet_names['average'] in wb.sheetnames:
-            avg_ws = wb[self.sheet_names['average']]
-            avg_ws.delete_rows(1, avg_ws.max_row)
-        else:
-            avg_ws = wb.create_sheet(self.sheet_names['average'])
-        
-        # Write header and labels
-        avg_ws['A1'] = 'Label'
-        for idx, label in enumerate(labels, start=2):
-            avg_ws[f'A{idx}'] = label
-        
-        # Write header
-        avg_ws['B1'] = 'Average Use'
-        
-        # Calculate averages
-        for idx, label in enumerate(labels, start=2):
-            differences = []
-            for col in range(2, diff_ws.max_column + 1):
-                col_letter = get_column_letter(col)
-                val = diff_ws[f'{col_letter}{idx}'].value
-                if val is not None:
-                    try:
-                        diff_value = float(val)
-                        # Only include non-negative differences
-                        if diff_value >= 0:
-                            differences.append(diff_value)
-                    except (ValueError, TypeError):
-                        pass
-            
-            if differences:
-                avg_use = sum(differences) / len(differences)
-                avg_ws[f'B{idx}'] = round(avg_use, 2)
-        
-        # Organize sheets and remove defaults
-        self._organize_sheets(wb)
-        wb.save(output_path)
-    
-    def update_predictions(self, current_stock_file: str = None, current_stock_columns: tuple = ('Label', 'Stock')):
-        """Update the Current Inventory & Predictions sheet.
-        
-        Creates predictions based on average use and compares with current stock.
-        
+            keep.append(j)
+
+        return (diff_headers, all_diffs[:, keep])
+
+    def _compute_average_use(self, diffs: tuple) -> np.ndarray:
+        """Average the non-negative differences per label.
+
         Args:
-            current_stock_file: Path to file containing current stock data (if different from history)
-            current_stock_columns: Tuple of (label_column, stock_column) header names
+            diffs: (diff_headers, diff_matrix) tuple from _compute_differences
+
+        Returns:
+            Float64 array aligned with the cached label order; NaN for labels
+            with no usable differences
         """
-        output_path = Path(self.output_file)
-        if not output_path.exists():
-            raise FileNotFoundError(f"Output file {self.output_file} does not exist")
-        
-        wb = load_workbook(output_path)
-        avg_ws = wb[self.sheet_names['average']]
-        history_ws = wb[self.sheet_names['history']]
-        
-        # Get current stock from the latest sale column in history
-        labels = [cell.value for cell in avg_ws['A'][1:] if cell.value and cell.value != 'Label']
-        latest_col = get_column_letter(history_ws.max_column)
-        current_stock_map = {}
-        
-        for idx, label in enumerate(labels, start=2):
-            stock = history_ws[f'{latest_col}{idx}'].value
-            if stock is not None:
-                try:
-                    current_stock_map[label] = float(stock)
-                except (ValueError, TypeError):
-                    pass
-        
-        # Create or update the predictions sheet
-        if self.sheet_names['predictions'] in wb.sheetnames:
-            pred_ws = wb[self.sheet_names['predictions']]
-            pred_ws.delete_rows(1, pred_ws.max_row)
+        _, diff_matrix = diffs
+        if diff_matrix.size == 0:
+            return np.full(len(self._labels), np.nan)
+
+        # Negative differences (restocks mid-sale, count corrections) are
+        # excluded from the average just like missing values
+        if HAS_NUMBA:
+            averages = masked_mean_nonneg(np.ascontiguousarray(diff_matrix))
         else:
-            pred_ws = wb.create_sheet(self.sheet_names['predictions'])
-        
-        # Write headers
-        pred_ws['A1'] = 'Label'
-        pred_ws['B1'] = 'Current Stock'
-        pred_ws['C1'] = 'Quarterly Prediction'
-        pred_ws['D1'] = 'Status'
-        
-        # Write data
-        for idx, label in enumerate(labels, start=2):
-            pred_ws[f'A{idx}'] = label
-            
-            # Current stock
-            current = current_stock_map.get(label, 0)
-            pred_ws[f'B{idx}'] = current
-            
-            # Average use * 7 for weekly prediction
-            avg_use = avg_ws[f'B{idx}'].value
-            if avg_use is not None:
-                try:
-                    prediction = float(avg_use) * 7
-                    pred_ws[f'C{idx}'] = round(prediction, 2)
-                    
-                    # Status and coloring
-                    if current >= prediction:
-                        pred_ws[f'D{idx}'] = 'Adequate Stock'
-                        pred_ws[f'D{idx}'].fill = PatternFill(start_color='00B050', end_color='00B050', fill_type='solid')
-                        pred_ws[f'D{idx}'].font = Font(color='FFFFFF', bold=True)
-                    else:
-                        shortage = prediction - current
-                        pred_ws[f'D{idx}'] = round(shortage, 2)
-                        
-                        # Color gradient from light green (1) to red (15+)
-                        color = self._get_shortage_color(shortage)
-                        pred_ws[f'D{idx}'].fill = PatternFill(start_color=color, end_color=color, fill_type='solid')
-                
-                except (ValueError, TypeError):
-                    pass
-        
-        # Adjust column widths
-        pred_ws.column_dimensions['A'].width = 20
-        pred_ws.column_dimensions['B'].width = 15
-        pred_ws.column_dimensions['C'].width = 15
-        pred_ws.column_dimensions['D'].width = 20
-        
-        # Organize sheets and remove defaults
-        self._organize_sheets(wb)
-        wb.save(output_path)
-    
-    def _get_shortage_color(self, shortage: float) -> str:
-        """Generate a color based on shortage amount (light green to red gradient).
-        
+            arr = np.where(diff_matrix < 0, np.nan, diff_matrix)
+            valid = ~np.isnan(arr).all(axis=1)
+            averages = np.full(len(self._labels), np.nan)
+            if valid.any():
+                averages[valid] = np.nanmean(arr[valid], axis=1)
+        return np.round(averages, 2)
+
+    def _compute_predictions(self, averages: np.ndarray) -> list:
+        """Build prediction rows from current stock and average use.
+
+        Current stock is taken from the most recent history column.
+
         Args:
-            shortage: Amount of shortage
-            
+            averages: Float64 array of average use aligned with the labels
+
         Returns:
-            Hex color code
+            List of (label, current_stock, prediction, status) tuples;
+            prediction and status are None when no average is available, and
+            status is either 'Adequate Stock' or the numeric shortage
         """
-        # At 1: light green (C6EFCE), at 15+: red (FFC7CE)
-        if shortage >= 15:
-            return 'FFC7CE'
-        
-        # Linear interpolation between light green and red
-        # Green: C6EFCE, Red: FFC7CE
-        ratio = min(shortage / 15, 1.0)
-        
-        # RGB values
-        r_start, g_start, b_start = 0xC6, 0xEF, 0xCE
-        r_end, g_end, b_end = 0xFF, 0xC7, 0xCE
-        
-        r = int(r_start + (r_end - r_start) * ratio)
-        g = int(g_start + (g_end - g_start) * ratio)
-        b = int(b_start + (b_end - b_start) * ratio)
-        
-        return f'{r:02X}{g:02X}{b:02X}'
-    
+        has_columns = self._matrix.shape[1] > 0
+
+        rows = []
+        for i, label in enumerate(self._labels):
+            latest = self._matrix[i, -1] if has_columns else np.nan
+            current = 0 if np.isnan(latest) else latest.item()
+            avg_use = averages[i]
+            if np.isnan(avg_use):
+                rows.append((label, current, None, None))
+                continue
+
+            # Average use * 7 for weekly prediction
+            prediction = avg_use.item() * 7
+            if current >= prediction:
+                rows.append((label, current, round(prediction, 2), 'Adequate Stock'))
+            else:
+                rows.append((label, current, round(prediction, 2), round(prediction - current, 2)))
+        return rows
+
+    def save(self):
+        """Recompute any stale analysis and write the output workbook to disk.
+
+        This is the only method that touches the output file; all update_*
+        methods only mutate the cached in-memory state.
+        """
+        self._ensure_state_loaded()
+        self._refresh_analysis()
+        self._write_output()
+
+    def _refresh_analysis(self):
+        """Fill in whichever analysis caches are stale."""
+        if self._diffs is None:
+            self._diffs = self._compute_differences()
+        if self._averages is None:
+            self._averages = self._compute_average_use(self._diffs)
+        if self._predictions is None:
+            self._predictions = self._compute_predictions(self._averages)
+        self._history_digest_cached = self._history_digest()
+
+    def _sheet_frame(self, headers: list, matrix: np.ndarray) -> pd.DataFrame:
+        """Build one sheet's DataFrame from a value matrix plus a Label column."""
+        frame = pd.DataFrame(matrix, columns=headers)
+        frame.insert(0, 'Label', self._labels)
+        return frame
+
+    def _write_output(self):
+        """Write all four analysis sheets in one shot through xlsxwriter.
+
+        Each sheet is a DataFrame handed to a single pd.ExcelWriter context,
+        so no openpyxl cell graph is ever built; NaN entries come out as
+        blanks. The Status column is colored by Excel conditional formats (a
+        3-color scale for shortages plus a solid green rule for adequate
+        stock) instead of per-cell styles.
+        """
+        labels = self._labels
+        diff_headers, diff_matrix = self._diffs
+
+        predictions = pd.DataFrame(
+            self._predictions,
+            columns=['Label', 'Current Stock', 'Quarterly Prediction', 'Status'],
+        )
+        history = self._sheet_frame(self._headers, self._matrix)
+        differences = self._sheet_frame(diff_headers, diff_matrix)
+        averages = pd.DataFrame({'Label': labels, 'Average Use': self._averages})
+
+        with pd.ExcelWriter(self.output_file, engine='xlsxwriter') as writer:
+            # Sheets are written in display order, so no reordering pass is needed
+            predictions.to_excel(writer, sheet_name=self.sheet_names['predictions'], index=False)
+            history.to_excel(writer, sheet_name=self.sheet_names['history'], index=False)
+            differences.to_excel(writer, sheet_name=self.sheet_names['differences'], index=False)
+            averages.to_excel(writer, sheet_name=self.sheet_names['average'], index=False)
+
+            pred_ws = writer.sheets[self.sheet_names['predictions']]
+            for col_range, width in zip(('A:A', 'B:B', 'C:C', 'D:D'), (20, 15, 15, 20)):
+                pred_ws.set_column(col_range, width)
+
+            if labels:
+                status_range = f'D2:D{len(labels) + 1}'
+                adequate_format = writer.book.add_format(
+                    {'bg_color': '#00B050', 'font_color': '#FFFFFF', 'bold': True})
+                pred_ws.conditional_format(status_range, {
+                    'type': 'cell', 'criteria': '==', 'value': '"Adequate Stock"',
+                    'format': adequate_format,
+                })
+                pred_ws.conditional_format(status_range, {
+                    'type': '3_color_scale',
+                    'min_type': 'num', 'min_value': 0, 'min_color': SHORTAGE_MIN_COLOR,
+                    'mid_type': 'num', 'mid_value': 7.5, 'mid_color': SHORTAGE_MID_COLOR,
+                    'max_type': 'num', 'max_value': 15, 'max_color': SHORTAGE_MAX_COLOR,
+                })
+
     def process_inventory(self, input_file: str, sale_number: str, 
                          label_column: str = 'Label', stock_column: str = 'Stock',
                          output_file: str = None) -> str:
@@ -522,24 +518,24 @@ class InventoryManager:
             FileNotFoundError: If input file doesn't exist
             ValueError: If required columns aren't found
         """
-        if output_file:
+        if output_file and output_file != self.output_file:
             self.output_file = output_file
-        
+            self._labels = None
+            self._invalidate_analysis()
+
         input_path = Path(input_file)
         if not input_path.exists():
             raise FileNotFoundError(f"Input file not found: {input_file}")
-        
+
         # Extract data
         data = self.extract_columns(input_file, [label_column, stock_column])
         labels = data[label_column]
         stock = data[stock_column]
-        
-        # Update all sheets
-        self.update_inventory_history(labels, stock, sale_number)
-        self.update_sales_differences()
-        self.update_average_use()
-        self.update_predictions()
-        
+
+        # Merge the new column into cached state and write the output once
+        self._append_history_column(labels, stock, f'Sale {sale_number}')
+        self.save()
+
         return str(Path(self.output_file).resolve())
     
     def process_restock(self, input_file: str, 
@@ -564,22 +560,22 @@ class InventoryManager:
             FileNotFoundError: If input file doesn't exist
             ValueError: If required columns aren't found
         """
-        if output_file:
+        if output_file and output_file != self.output_file:
             self.output_file = output_file
-        
+            self._labels = None
+            self._invalidate_analysis()
+
         input_path = Path(input_file)
         if not input_path.exists():
             raise FileNotFoundError(f"Input file not found: {input_file}")
-        
+
         # Extract data
         data = self.extract_columns(input_file, [label_column, stock_column])
         labels = data[label_column]
         stock = data[stock_column]
-        
-        # Update inventory history with restock entry
-        self._update_inventory_history_restock(labels, stock)
-        self.update_sales_differences()
-        self.update_average_use()
-        self.update_predictions()
-        
+
+        # Merge the new column into cached state and write the output once
+        self._append_history_column(labels, stock, 'Restock')
+        self.save()
+
         return str(Path(self.output_file).resolve())
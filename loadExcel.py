@@ -1,6 +1,7 @@
 import tkinter as tk
 from tkinter import filedialog, messagebox, ttk
 import os
+from concurrent.futures import ThreadPoolExecutor
 from PIL import Image, ImageTk
 from extractData import InventoryManager
 
@@ -176,7 +177,9 @@ class ExcelLoaderGUI:
         self.root.geometry("380x300")
         self.selected_file_path = None
         self.manager = InventoryManager()  # Keep a reference to the manager for recompute
-        
+        # Single worker so pipeline runs stay serialized off the Tk main thread
+        self._executor = ThreadPoolExecutor(max_workers=1)
+
         self._create_widgets()
         
         # Show instructions window on startup
@@ -206,8 +209,10 @@ class ExcelLoaderGUI:
         button_frame = ttk.Frame(self.root)
         button_frame.pack(pady=20)
         
-        ttk.Button(button_frame, text="Submit new sale or restock", command=self.submit).pack(side=tk.LEFT, padx=5)
-        ttk.Button(button_frame, text="Recompute analysis based on existing inventory data", command=self.recompute).pack(side=tk.LEFT, padx=5)
+        self.submit_button = ttk.Button(button_frame, text="Submit new sale or restock", command=self.submit)
+        self.submit_button.pack(side=tk.LEFT, padx=5)
+        self.recompute_button = ttk.Button(button_frame, text="Recompute analysis based on existing inventory data", command=self.recompute)
+        self.recompute_button.pack(side=tk.LEFT, padx=5)
         
         # Add help button
         ttk.Button(self.root, text="Help", command=self._show_instructions).pack(pady=5)
@@ -238,35 +243,70 @@ class ExcelLoaderGUI:
             messagebox.showwarning("Input Error", "Please select an Excel file")
             return
         
+        # Process the inventory data on the worker thread so the GUI stays responsive
+        self._set_busy(True)
+        if entry_type == "sale":
+            future = self._executor.submit(
+                self.manager.process_inventory,
+                input_file=file_path,
+                sale_number=sale_number,
+                label_column='Label',
+                stock_column='Stock'
+            )
+        else:  # restock
+            future = self._executor.submit(
+                self.manager.process_restock,
+                input_file=file_path,
+                label_column='Label',
+                stock_column='Stock'
+            )
+        future.add_done_callback(lambda f: self.root.after(0, self._on_submit_done, f))
+
+    def _on_submit_done(self, future):
+        """Show the result of a background submit on the main thread.
+
+        Args:
+            future: The completed future holding the output file path or error
+        """
+        self._set_busy(False)
         try:
-            # Process the inventory data
-            
-            if entry_type == "sale":
-                output_file = self.manager.process_inventory(
-                    input_file=file_path,
-                    sale_number=sale_number,
-                    label_column='Label',
-                    stock_column='Stock'
-                )
-            else:  # restock
-                output_file = self.manager.process_restock(
-                    input_file=file_path,
-                    label_column='Label',
-                    stock_column='Stock'
-                )
-            
+            output_file = future.result()
             messagebox.showinfo("Success", f"Inventory processed successfully!\n\nOutput file: {output_file}")
         except Exception as e:
             messagebox.showerror("Error", f"Failed to process inventory:\n{str(e)}")
-    
+
     def recompute(self):
         """Recompute all analysis sheets without importing new data."""
+        self._set_busy(True)
+        future = self._executor.submit(self._recompute_job)
+        future.add_done_callback(lambda f: self.root.after(0, self._on_recompute_done, f))
+
+    def _recompute_job(self):
+        """Recompute all analysis sheets in memory, then write once."""
+        self.manager.update_sales_differences()
+        self.manager.update_average_use()
+        self.manager.update_predictions()
+        self.manager.save()
+
+    def _on_recompute_done(self, future):
+        """Show the result of a background recompute on the main thread.
+
+        Args:
+            future: The completed future for the recompute job
+        """
+        self._set_busy(False)
         try:
-            # Recompute all analysis sheets
-            self.manager.update_sales_differences()
-            self.manager.update_average_use()
-            self.manager.update_predictions()
-            
+            future.result()
             messagebox.showinfo("Success", "Analysis sheets recomputed successfully!")
         except Exception as e:
-            messagebox.showerror("Error", f"Failed to recompute analysis:\n{str(e)}")
\ No newline at end of file
+            messagebox.showerror("Error", f"Failed to recompute analysis:\n{str(e)}")
+
+    def _set_busy(self, busy):
+        """Enable or disable the action buttons while a job is running.
+
+        Args:
+            busy: True to disable the buttons, False to re-enable them
+        """
+        state = tk.DISABLED if busy else tk.NORMAL
+        self.submit_button.config(state=state)
+        self.recompute_button.config(state=state)
\ No newline at end of file